@@ -1,55 +1,125 @@
 import requests
-from bs4 import BeautifulSoup
+import requests_cache
+import lxml.html
+from lxml import etree
 import pandas as pd
-from datetime import datetime
-import time
+from datetime import datetime, timedelta
 import re
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from textblob import TextBlob
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from textblob.en import sentiment as pattern_sentiment
 from tqdm import tqdm
 
-def fetch_page(url, headers):
+# XPath expressions used while walking each page, compiled once at import
+ARTICLES = etree.XPath('//article')
+TIME = etree.XPath('.//time/@datetime', smart_strings=False)
+TITLE = etree.XPath('.//*[self::h1 or self::h2]')
+CONTENT = etree.XPath(".//div[contains(concat(' ', normalize-space(@class), ' '), ' entry-content ')]")
+FIRST_A = etree.XPath('.//a/@href', smart_strings=False)
+COMMENT_TEXT = etree.XPath(".//text()[contains(., 'Comment')]", smart_strings=False)
+
+# Regular expressions, compiled once at import rather than on every call
+QUALIFIERS = ['excellent', 'fascinating', 'wonderful', 'great', 'outstanding', 'remarkable', 'contentious']
+# Matched against casefolded text, so no per-character IGNORECASE folding
+QUALIFIER_RE = re.compile(r'\b(' + '|'.join(QUALIFIERS) + r')\b')
+QUALIFIER_MATCH = re.compile(r'my\s+(\w+)\s+conversation', re.IGNORECASE)
+COMMENT_NUM = re.compile(r'(\d+)\s+Comment')
+RECOMMENDED = re.compile(r'Recommended\s*$')
+DATETIME_ATTR = re.compile(rb'datetime=["\']?(\d{4}-\d{2}-\d{2})')
+
+# Columns of the DataFrame returned by analyze_posts
+RESULT_COLUMNS = ['date', 'title', 'qualifiers', 'has_excellent', 'sentiment_score', 'url',
+                  'title_qualifier', 'comment_count', 'ends_with_recommended']
+
+# Concurrent page fetches; also the size of the session's connection pool
+MAX_WORKERS = 10
+# Polite ceiling on requests sent to the site, shared by all workers
+REQUESTS_PER_SECOND = 10
+# On-disk HTTP cache so reruns skip pages fetched recently; every index page
+# shifts when a new post is published, so all pages share one lifetime
+CACHE_NAME = 'mr_cache'
+CACHE_EXPIRE_AFTER = timedelta(hours=1)
+
+class ThrottledAdapter(requests.adapters.HTTPAdapter):
+    """
+    HTTPAdapter that spaces outgoing requests at least min_interval seconds
+    apart across all threads; each worker waits for its own slot
     """
-    Fetch a single page with error handling
+    def __init__(self, min_interval, **kwargs):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        super().__init__(**kwargs)
+    
+    def send(self, request, **kwargs):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.min_interval
+        if delay > 0:
+            time.sleep(delay)
+        return super().send(request, **kwargs)
+
+def fetch_page(session, url):
+    """
+    Fetch a single page with error handling, returning the raw body bytes
+    so the parser decodes them itself
     """
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = session.get(url, timeout=10)
         response.raise_for_status()
-        return response.text
+        return response.content
     except Exception as e:
         print(f"Error fetching {url}: {str(e)}")
         return None
 
+def element_string(element):
+    """
+    Mirror BeautifulSoup's Tag.string: the element's text if it has a
+    single text child, recursing through a lone child element
+    """
+    children = list(element)
+    if element.text:
+        return None if children else element.text
+    if len(children) == 1 and not children[0].tail:
+        return element_string(children[0])
+    return None
+
 def extract_content_sections(entry):
     """
     Extracts different sections of the blog post content:
     - Tyler's commentary (excluding blockquotes)
     - Whether post ends with "Recommended"
     """
-    content_div = entry.find('div', class_='entry-content')
-    if not content_div:
+    content = CONTENT(entry)
+    if not content:
         return "", False
+    content_div = content[0]
     
-    # Get all content elements
-    elements = content_div.contents
+    # Get all content nodes as (tag, string) pairs; bare text has no tag
+    elements = [(None, content_div.text)]
+    for child in content_div:
+        elements.append((child.tag, element_string(child)))
+        elements.append((None, child.tail))
     tyler_commentary = []
     in_blockquote = False
     
-    for element in elements:
-        if element.name == 'blockquote':
+    for name, string in elements:
+        if name == 'blockquote':
             in_blockquote = True
             continue
-        elif in_blockquote and element.name in ['p', 'div']:
+        elif in_blockquote and name in ['p', 'div']:
             in_blockquote = False
         
-        if not in_blockquote and element.string:
-            tyler_commentary.append(element.string.strip())
+        if not in_blockquote and string:
+            tyler_commentary.append(string.strip())
     
     # Join Tyler's commentary
     commentary = ' '.join(filter(None, tyler_commentary))
     
     # Check if post ends with "Recommended"
-    ends_with_recommended = bool(re.search(r'Recommended\s*$', content_div.get_text().strip()))
+    ends_with_recommended = bool(RECOMMENDED.search(content_div.text_content().strip()))
     
     return commentary, ends_with_recommended
 
@@ -59,8 +129,9 @@ def extract_comment_count(entry):
     """
     comment_text = None
     
-    # Look for text ending in "Comments" or "Comment"
-    for element in entry.strings:
+    # Look for text ending in "Comments" or "Comment"; libxml2 hands back only
+    # the text nodes that mention "Comment" rather than every string
+    for element in COMMENT_TEXT(entry):
         text = element.strip()
         if text.endswith('Comments') or text.endswith('Comment'):
             comment_text = text
@@ -68,7 +139,7 @@ def extract_comment_count(entry):
     
     if comment_text:
         # Extract the number from strings like "8 Comments"
-        count_match = re.search(r'(\d+)\s+Comment', comment_text)
+        count_match = COMMENT_NUM.search(comment_text)
         if count_match:
             return int(count_match.group(1))
         elif comment_text == "Comment":  # Single comment case
@@ -78,46 +149,58 @@ def extract_comment_count(entry):
 
 def process_page(html, podcast_pattern, cutoff_date):
     """
-    Process a single page of HTML and extract podcast posts
+    Process a single page of HTML bytes and extract podcast posts
     """
     if not html:
         return [], False
     
+    # A page that never mentions "conversation" cannot hold a podcast post, so
+    # skip parsing it unless one of its dates may also reach the cutoff
+    if b'conversation' not in html.lower():
+        cutoff = cutoff_date.strftime('%Y-%m-%d').encode()
+        if all(date >= cutoff for date in DATETIME_ATTR.findall(html)):
+            return [], False
+    
     posts = []
-    soup = BeautifulSoup(html, 'html.parser')
-    entries = soup.find_all('article')
+    doc = lxml.html.fromstring(html)
+    entries = ARTICLES(doc)
     
     for entry in entries:
-        date_elem = entry.find('time')
-        if not (date_elem and date_elem.get('datetime')):
+        date_attr = TIME(entry)
+        if not (date_attr and date_attr[0]):
             continue
             
-        post_date = datetime.strptime(date_elem['datetime'][:10], '%Y-%m-%d')
+        # ISO dates have fixed offsets, so slice rather than strptime
+        date_str = date_attr[0]
+        post_date = datetime(int(date_str[:4]), int(date_str[5:7]), int(date_str[8:10]))
         if post_date < cutoff_date:
             return posts, True  # Second value indicates we've hit the cutoff
         
-        title_elem = entry.find('h1') or entry.find('h2')
-        if not title_elem:
+        # One walk for both headings; an h1 still wins over an earlier h2
+        title_elems = TITLE(entry)
+        if not title_elems:
             continue
             
-        title = title_elem.text.strip()
+        title_elem = next((elem for elem in title_elems if elem.tag == 'h1'), title_elems[0])
+        title = title_elem.text_content().strip()
         if not podcast_pattern.search(title):
             continue
         
         # Extract content sections
         commentary, ends_with_recommended = extract_content_sections(entry)
         
-        qualifier_match = re.search(r'my\s+(\w+)\s+conversation', title, re.IGNORECASE)
+        qualifier_match = QUALIFIER_MATCH.search(title)
         qualifier = qualifier_match.group(1) if qualifier_match else None
         
         # Extract comment count
         comment_count = extract_comment_count(entry)
         
+        hrefs = FIRST_A(entry)
         posts.append({
             'date': post_date,
             'title': title,
             'commentary': commentary,
-            'url': entry.find('a')['href'] if entry.find('a') else '',
+            'url': hrefs[0] if hrefs else '',
             'title_qualifier': qualifier,
             'comment_count': comment_count,
             'ends_with_recommended': ends_with_recommended
@@ -125,9 +208,18 @@ def process_page(html, podcast_pattern, cutoff_date):
     
     return posts, False
 
-def get_blog_posts(base_url, max_pages=125):
+def fetch_and_process_page(session, url, podcast_pattern, cutoff_date):
+    """
+    Fetch and process a single page on a worker thread; lxml releases the
+    GIL while parsing, so pages are parsed alongside in-flight fetches
+    """
+    html = fetch_page(session, url)
+    return process_page(html, podcast_pattern, cutoff_date)
+
+def get_blog_posts(base_url, max_pages=125, cutoff_date=datetime(2024, 1, 1)):
     """
-    Scrapes blog posts from the website starting from January 1, 2024
+    Scrapes blog posts from the website starting from cutoff_date
+    (January 1, 2024 by default)
     """
     headers = {
         'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -137,31 +229,85 @@ def get_blog_posts(base_url, max_pages=125):
     }
     
     podcast_pattern = re.compile(r'my(?:\s+\w+)?\s+conversation(?:\s+(?:is|with))?|conversation(?:\s+(?:is|with))?', re.IGNORECASE)
-    cutoff_date = datetime(2024, 1, 1)
-    all_posts = []
+    page_posts = {}
     
-    urls = [f"{base_url}/page/{page}" if page > 1 else base_url for page in range(1, max_pages + 1)]
+    def page_url(page):
+        return f"{base_url}/page/{page}" if page > 1 else base_url
     
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        future_to_url = {executor.submit(fetch_page, url, headers): url for url in urls}
+    # One session for every page so the pooled keep-alive connection (and its
+    # TLS handshake) is reused; the pool is sized to match the worker count.
+    # Cache hits are answered before reaching the adapter, so they are not throttled
+    session = requests_cache.CachedSession(CACHE_NAME, backend='sqlite', expire_after=CACHE_EXPIRE_AFTER)
+    session.cache.delete(expired=True)
+    session.headers.update(headers)
+    adapter = ThrottledAdapter(1 / REQUESTS_PER_SECOND, pool_connections=MAX_WORKERS,
+                               pool_maxsize=MAX_WORKERS, max_retries=2)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    
+    with session, ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        # Sliding window: keep MAX_WORKERS pages in flight and only submit the
+        # next page while no completed page has reached the cutoff date
+        inflight = {}
+        next_page = 1
+        cutoff_page = None
+        
+        def submit_next():
+            nonlocal next_page
+            url = page_url(next_page)
+            future = executor.submit(fetch_and_process_page, session, url, podcast_pattern, cutoff_date)
+            inflight[future] = next_page
+            next_page += 1
         
-        with tqdm(total=len(urls), desc="Fetching pages") as pbar:
-            for future in as_completed(future_to_url):
-                url = future_to_url[future]
-                try:
-                    html = future.result()
-                    if html:
-                        posts, reached_cutoff = process_page(html, podcast_pattern, cutoff_date)
-                        all_posts.extend(posts)
-                        if reached_cutoff:
-                            break
-                except Exception as e:
-                    print(f"Error processing {url}: {str(e)}")
-                finally:
-                    pbar.update(1)
-                    time.sleep(0.5)
-    
-    return all_posts
+        while next_page <= min(MAX_WORKERS, max_pages):
+            submit_next()
+        
+        with tqdm(total=max_pages, desc="Fetching pages") as pbar:
+            while inflight:
+                done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    page = inflight.pop(future)
+                    try:
+                        posts, reached_cutoff = future.result()
+                        page_posts[page] = posts
+                        if reached_cutoff and (cutoff_page is None or page < cutoff_page):
+                            cutoff_page = page
+                            # Later pages only hold older posts; drop any not yet started
+                            for other, other_page in list(inflight.items()):
+                                if other_page > cutoff_page and other.cancel():
+                                    del inflight[other]
+                    except Exception as e:
+                        print(f"Error processing {page_url(page)}: {str(e)}")
+                    finally:
+                        pbar.update(1)
+                    
+                    if cutoff_page is None and next_page <= max_pages:
+                        submit_next()
+    
+    # Pages complete out of order; return posts newest first
+    return [post for page in sorted(page_posts) for post in page_posts[page]]
+
+def score_sentiment(text):
+    """
+    TextBlob polarity of a piece of text, scored directly against the
+    preloaded pattern lexicon without building a TextBlob per call
+    """
+    if not text:
+        return 0
+    polarity, _ = pattern_sentiment(text)
+    return polarity
+
+def score_sentiments(texts):
+    """
+    Score a batch of texts in one call, computing each distinct text once.
+    Scoring is pure Python, so it is spread over worker processes to
+    sidestep the GIL
+    """
+    unique_texts = list(dict.fromkeys(texts))
+    with ProcessPoolExecutor() as executor:
+        polarities = executor.map(score_sentiment, unique_texts, chunksize=8)
+        scores = dict(zip(unique_texts, tqdm(polarities, total=len(unique_texts), desc="Analyzing posts")))
+    return [scores[text] for text in texts]
 
 def analyze_posts(posts):
     """
@@ -169,44 +315,26 @@ def analyze_posts(posts):
     """
     if not posts:
         print("No posts to analyze.")
-        return pd.DataFrame(columns=['date', 'title', 'qualifiers', 'sentiment_score', 'url', 
-                                   'title_qualifier', 'comment_count', 'ends_with_recommended'])
+        return pd.DataFrame(columns=RESULT_COLUMNS)
     
-    results = []
+    df = pd.DataFrame(posts)
     
-    for post in tqdm(posts, desc="Analyzing posts"):
-        qualifiers = []
-        if post.get('title_qualifier'):
-            qualifiers.append(post['title_qualifier'].lower())
-        
-        # Look for qualifiers in title and Tyler's commentary
-        if (re.search(r'excellent', post['title'], re.IGNORECASE) or 
-            re.search(r'excellent', post['commentary'], re.IGNORECASE)):
-            if 'excellent' not in qualifiers:
-                qualifiers.append('excellent')
-        
-        other_qualifiers = ['fascinating', 'wonderful', 'great', 'outstanding', 'remarkable', 'contentious']
-        for qualifier in other_qualifiers:
-            if (re.search(rf'\b{qualifier}\b', post['title'], re.IGNORECASE) or 
-                re.search(rf'\b{qualifier}\b', post['commentary'], re.IGNORECASE)):
-                if qualifier not in qualifiers:
-                    qualifiers.append(qualifier)
-        
-        # Sentiment analysis only on Tyler's commentary
-        sentiment_score = TextBlob(post['commentary']).sentiment.polarity if post['commentary'] else 0
-        
-        results.append({
-            'date': post['date'],
-            'title': post['title'],
-            'qualifiers': qualifiers,
-            'sentiment_score': sentiment_score,
-            'url': post['url'],
-            'title_qualifier': post.get('title_qualifier'),
-            'comment_count': post['comment_count'],
-            'ends_with_recommended': post['ends_with_recommended']
-        })
+    # Look for qualifiers in title and Tyler's commentary across all posts at
+    # once, casefolded once per post
+    text = (df['title'] + ' ' + df['commentary']).str.casefold()
+    found = text.str.findall(QUALIFIER_RE).map(set)
+    title_qualifiers = df['title_qualifier'].str.lower().fillna('')
+    # Sorted so the stored lists are deterministic
+    df['qualifiers'] = [
+        sorted(matches | {title_qualifier} if title_qualifier else matches)
+        for title_qualifier, matches in zip(title_qualifiers, found)
+    ]
+    df['has_excellent'] = ['excellent' in qualifiers for qualifiers in df['qualifiers']]
+    
+    # Sentiment analysis only on Tyler's commentary
+    df['sentiment_score'] = score_sentiments(df['commentary'].tolist())
     
-    return pd.DataFrame(results)
+    return df[RESULT_COLUMNS]
 
 def main():
     base_url = 'https://marginalrevolution.com'
@@ -218,25 +346,25 @@ def main():
     
     print("\nAnalyzing posts...")
     df = analyze_posts(posts)
+    df['title_qualifier'] = df['title_qualifier'].astype('category')
     
     if len(df) > 0:
         print("\nPosts by title qualifier:")
-        title_qualifiers = df[df['title_qualifier'].notna()]['title_qualifier'].value_counts()
+        title_qualifiers = df['title_qualifier'].value_counts()
         print(title_qualifiers)
         
         recommended_count = df['ends_with_recommended'].sum()
         print(f"\nPosts ending with 'Recommended': {recommended_count} ({(recommended_count/len(df)*100):.1f}%)")
         
         print("\nPosts with 'excellent' qualifier:")
-        excellent_posts = df[df['qualifiers'].apply(lambda x: 'excellent' in x)]
+        excellent_posts = df[df['has_excellent']]
         print(f"Total: {len(excellent_posts)}")
         for _, post in excellent_posts.iterrows():
             print(f"- {post['date'].strftime('%Y-%m-%d')}: {post['title']} ({post['comment_count']} comments)")
         
         print("\nAll qualifiers found:")
-        all_qualifiers = [q for quals in df['qualifiers'] for q in quals]
-        if all_qualifiers:
-            qualifier_counts = pd.Series(all_qualifiers).value_counts()
+        qualifier_counts = df['qualifiers'].explode().value_counts()
+        if len(qualifier_counts) > 0:
             print(qualifier_counts)
         else:
             print("No qualifiers found")
@@ -244,9 +372,9 @@ def main():
         print("\nAverage sentiment score:", df['sentiment_score'].mean())
         print("Average comment count:", df['comment_count'].mean())
         
-        # Save results to CSV
-        df.to_csv('podcast_analysis.csv', index=False)
-        print("\nResults saved to podcast_analysis.csv")
+        # Save results to Parquet, which keeps qualifiers as a real list column
+        df.to_parquet('podcast_analysis.parquet', engine='pyarrow', compression='zstd', index=False)
+        print("\nResults saved to podcast_analysis.parquet")
     else:
         print("No posts found to analyze.")
 